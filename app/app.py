@@ -12,6 +12,19 @@ import spacy
 import numpy as np
 from datetime import datetime
 import os
+import sys
+import atexit
+
+# Truco para importar los módulos de src/ al ejecutar la app desde app/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import config
+from src.conversation import ConversationStore
+from src.features import es_hashing, nombres_terminos
+from src.shadow import ShadowEvaluator
+from src.explain_utils import (
+    cargar_o_construir_indice, explain_vector, format_explanation
+)
 
 # ============================================================
 # CONFIGURACIÓN Y CARGA DE MODELOS
@@ -34,6 +47,7 @@ except OSError:
 # Opción 1: Modelos actuales (Pipeline - PRIORIDAD)
 modelo_pipeline = '../models/modelo_triaje_svm.pkl'
 encoder_actual = '../models/label_encoder_final.pkl'
+indice_explicaciones = '../models/indice_explicaciones.pkl'
 
 # Opción 2: Modelos de la celda 4 del notebook (archivos separados)
 modelo_separado = '../models/svm_model.pickle'
@@ -78,6 +92,44 @@ except FileNotFoundError as e:
     print(f"\nArchivo faltante: {e}")
     exit(1)
 
+# Separamos vectorizador y clasificador para vectorizar una sola vez por consulta
+if usar_pipeline:
+    # Todo menos el SVM: TfidfVectorizer o Hashing + IDF según config.FEATURE_MODE
+    vectorizador = svm_model[:-1]
+    clasificador = svm_model[-1]
+else:
+    vectorizador = tfidf_vectorizer
+    clasificador = svm_model
+
+# Conversaciones por sesión: acumulan los síntomas descritos en varios mensajes
+conversaciones = ConversationStore(
+    vectorizador,
+    max_sesiones=config.CONVERSATION_MAX_SESSIONS,
+    max_turnos=config.CONVERSATION_MAX_TURNS,
+    max_inactividad=config.CONVERSATION_IDLE_SECONDS
+)
+
+# Índice de explicaciones (pesos por clase del SVM lineal)
+# Se recalcula si el guardado no corresponde al modelo cargado
+indice_explicacion = None
+try:
+    indice_explicacion = cargar_o_construir_indice(vectorizador, clasificador, indice_explicaciones)
+except AttributeError:
+    # Modelos no lineales no exponen coef_: la app funciona sin explicaciones
+    print("El modelo no es lineal: se omiten las explicaciones por término")
+
+# Modelo candidato en sombra: recibe las mismas consultas fuera del camino de respuesta
+candidato_sombra = ShadowEvaluator.from_paths(
+    config.CANDIDATE_MODEL_PATH,
+    config.CANDIDATE_LABEL_ENCODER_PATH
+    if os.path.exists(config.CANDIDATE_LABEL_ENCODER_PATH) else config.LABEL_ENCODER_PATH,
+    ruta_reporte=config.SHADOW_REPORT_PATH
+)
+if candidato_sombra is not None:
+    print("Modelo candidato cargado: evaluación en sombra activa")
+    # El hilo ya guarda el reporte periódicamente; al salir se guarda lo último
+    atexit.register(candidato_sombra.guardar_reporte, config.SHADOW_REPORT_PATH)
+
 # Configuración de negaciones (importantes en contexto médico)
 negaciones = {'no', 'sin', 'ni', 'nunca', 'jamás', 'tampoco'}
 for palabra in negaciones:
@@ -254,9 +306,10 @@ def obtener_recomendaciones_especialidad(especialidad):
     }
 
 
-def predecir_especialidad(sintomas_usuario):
+def predecir_especialidad(sintomas_usuario, sesion_id=None):
     """
     Función principal de predicción usando el modelo SVM
+    Si se indica 'sesion_id', la predicción usa todos los mensajes recientes de la sesión
     """
     # Validación de entrada
     if not sintomas_usuario or sintomas_usuario.strip() == "":
@@ -265,28 +318,59 @@ def predecir_especialidad(sintomas_usuario):
     # Procesamiento del texto
     texto_procesado = procesar_texto_medico(sintomas_usuario)
     
-    if not texto_procesado or len(texto_procesado.split()) < 2:
+    if not texto_procesado:
         return "No pude entender tus síntomas. Por favor, describe con más detalle qué sientes."
     
-    # Predicción según el tipo de modelo cargado
-    if usar_pipeline:
-        # Pipeline: vectorización + clasificación en un solo paso
-        prediccion_index = svm_model.predict([texto_procesado])[0]
-        probabilidades = svm_model.predict_proba([texto_procesado])[0]
+    # Vectorización única: se reutiliza para predecir y para explicar
+    if sesion_id is not None:
+        # Solo se analiza el mensaje nuevo; se suma a lo ya descrito en la sesión
+        texto_vectorizado, n_tokens, n_turnos = conversaciones.agregar_mensaje(sesion_id, texto_procesado)
     else:
-        # Modelos separados: vectorizar primero, luego clasificar
-        texto_vectorizado = tfidf_vectorizer.transform([texto_procesado]).toarray()
-        prediccion_index = svm_model.predict(texto_vectorizado)[0]
-        probabilidades = svm_model.predict_proba(texto_vectorizado)[0]
+        texto_vectorizado = vectorizador.transform([texto_procesado])
+        n_tokens, n_turnos = len(texto_procesado.split()), 1
+    
+    if n_tokens < 2:
+        return "No pude entender tus síntomas. Por favor, describe con más detalle qué sientes."
+    
+    # Los modelos separados (celda 4 del notebook) se entrenaron con matrices densas
+    entrada = texto_vectorizado if usar_pipeline else texto_vectorizado.toarray()
+    prediccion_index = clasificador.predict(entrada)[0]
+    probabilidades = clasificador.predict_proba(entrada)[0]
     
     confianza = np.max(probabilidades) * 100
     
     # Decodificar especialidad
     especialidad = label_encoder.inverse_transform([prediccion_index])[0]
     
+    # Turnos limpios en los que se basó la predicción (toda la conversación retenida)
+    turnos = conversaciones.turnos(sesion_id) if sesion_id is not None else [texto_procesado]
+    
+    # Evaluación en sombra: solo encola, nunca espera al candidato.
+    # Recibe los turnos por separado para vectorizarlos igual que el principal
+    if candidato_sombra is not None:
+        candidato_sombra.enviar(turnos, especialidad)
+    
+    # Términos que más influyeron en la especialidad elegida
+    terminos_clave = []
+    if indice_explicacion is not None:
+        # En modo hashing no hay vocabulario: se nombran con los términos de
+        # cada turno por separado, como se contaron en la conversación
+        nombres = None
+        if es_hashing(vectorizador):
+            nombres = nombres_terminos(vectorizador, turnos)
+        terminos_clave = explain_vector(texto_vectorizado, prediccion_index, indice_explicacion, nombres=nombres)
+    
     # Obtener recomendaciones
     info = obtener_recomendaciones_especialidad(especialidad)
     
+    texto_contexto = ""
+    if n_turnos > 1:
+        texto_contexto = f"**Síntomas considerados:** tus últimos {n_turnos} mensajes\n"
+    
+    texto_terminos = ""
+    if terminos_clave:
+        texto_terminos = f"**Términos clave:** {format_explanation(terminos_clave)}\n"
+    
     # Construir respuesta
     respuesta = f"""
 **ANÁLISIS COMPLETADO**
@@ -294,7 +378,7 @@ def predecir_especialidad(sintomas_usuario):
 {info['emoji']} **Especialidad Recomendada:** {especialidad.upper()}
 **Nivel de Confianza:** {confianza:.1f}%
 **Nivel de Urgencia:** {info['urgencia']}
-
+{texto_contexto}{texto_terminos}
 **Recomendación:**
 {info['consejo']}
 
@@ -321,10 +405,11 @@ Análisis realizado: {datetime.now().strftime("%d/%m/%Y %H:%M:%S")}
 # FUNCIÓN DE CHATBOT CONVERSACIONAL
 # ============================================================
 
-def chatbot_respuesta(mensaje, historial):
+def chatbot_respuesta(mensaje, historial, sesion_id=None):
     """
     Función que maneja la conversación del chatbot
     Retorna el historial actualizado en formato compatible con Gradio 6.0
+    'sesion_id' permite combinar los síntomas descritos en varios mensajes
     """
     # Saludos y despedidas
     mensaje_lower = mensaje.lower().strip()
@@ -358,10 +443,13 @@ En emergencias, llama al 911
 No te automediques
 
 ¡Hasta pronto! """
+        # La próxima consulta empieza desde cero
+        if sesion_id is not None:
+            conversaciones.reiniciar(sesion_id)
     
     else:
         # Procesamiento de síntomas
-        respuesta = predecir_especialidad(mensaje)
+        respuesta = predecir_especialidad(mensaje, sesion_id)
     
     # Inicializar historial si es None
     if historial is None:
@@ -422,8 +510,10 @@ with gr.Blocks(title="Clasificador de Urgencias Médicas") as demo:
         enviar_btn = gr.Button("Enviar ", variant="primary", scale=1)
     
     # Función para limpiar el input después de enviar
-    def responder_y_limpiar(mensaje, historial):
-        nuevo_historial = chatbot_respuesta(mensaje, historial if historial else [])
+    def responder_y_limpiar(mensaje, historial, request: gr.Request):
+        # session_hash identifica la pestaña del navegador (una conversación por pestaña)
+        sesion_id = request.session_hash if request else None
+        nuevo_historial = chatbot_respuesta(mensaje, historial if historial else [], sesion_id)
         return nuevo_historial, ""  # Retorna historial actualizado y limpia el textbox
     
     gr.Markdown("### Ejemplos de consultas:")
@@ -0,0 +1,148 @@
+import os
+import sys
+import heapq
+import argparse
+import numpy as np
+import pandas as pd
+
+# Truco para importar módulos hermanos si se ejecuta como script
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import config
+from src.data_utils import limpiar_lote, cargar_corpus
+from src.predict import load_artifacts
+
+def incertidumbre(probs, estrategia=config.ACTIVE_LEARNING_STRATEGY):
+    """
+    Puntuación de incertidumbre por fila (mayor = más informativo para etiquetar).
+
+    - 'margen': 1 - (p1 - p2), donde p1 y p2 son las dos probabilidades más altas.
+    - 'entropia': entropía de la distribución normalizada por log(n_clases).
+    """
+    if estrategia == 'margen':
+        top2 = np.partition(probs, -2, axis=1)[:, -2:]
+        return 1.0 - (top2[:, 1] - top2[:, 0])
+    if estrategia == 'entropia':
+        p = np.clip(probs, 1e-12, 1.0)
+        return -(p * np.log(p)).sum(axis=1) / np.log(probs.shape[1])
+    raise ValueError(f"Estrategia desconocida: {estrategia}")
+
+def _seleccion_diversa(vectores, puntuaciones, k):
+    """
+    Elige k candidatos equilibrando incertidumbre y diversidad.
+
+    Greedy: primero el más incierto; después, el que maximiza
+    incertidumbre * (1 - similitud coseno máxima con los ya elegidos).
+    Las filas TF-IDF están normalizadas L2, así que el producto es el coseno.
+    """
+    n = vectores.shape[0]
+    if n <= k:
+        return np.argsort(-puntuaciones)
+
+    similitud_max = np.zeros(n)
+    elegidos = []
+    disponibles = np.ones(n, dtype=bool)
+    for _ in range(k):
+        valor = np.where(disponibles, puntuaciones * (1.0 - similitud_max), -np.inf)
+        elegido = int(np.argmax(valor))
+        elegidos.append(elegido)
+        disponibles[elegido] = False
+        similitud = np.asarray((vectores @ vectores[elegido].T).todense()).ravel()
+        similitud_max = np.maximum(similitud_max, similitud)
+    return np.array(elegidos)
+
+def seleccionar_para_etiquetar(path, model, le, text_col='texto',
+                               k=config.ACTIVE_LEARNING_QUEUE_SIZE,
+                               factor_pool=config.ACTIVE_LEARNING_POOL_FACTOR,
+                               estrategia=config.ACTIVE_LEARNING_STRATEGY,
+                               chunksize=config.ACTIVE_LEARNING_CHUNK_SIZE, excluir=None):
+    """
+    Recorre un CSV sin etiquetar una sola vez y propone los casos a etiquetar.
+
+    Cada lote se limpia y se puntúa; solo se retienen en un heap de tamaño fijo
+    (k * factor_pool) los candidatos más inciertos, así que la memoria no
+    depende del tamaño del archivo. Al final se eligen k de ellos buscando
+    además diversidad.
+
+    :param excluir: Conjunto de textos limpios que no se deben proponer (los que
+                    ya están en el corpus o en la cola de etiquetado).
+    :return: DataFrame con el formato del corpus procesado ('sintomas_procesados',
+             'especialidad' vacía) más columnas de apoyo para el clínico.
+    """
+    capacidad = k * factor_pool
+    heap = []  # (incertidumbre, fila, texto_limpio, texto_original, clase_predicha)
+    en_heap = set()  # Textos del heap: el mismo caso repetido en el CSV se propone una vez
+    excluir = excluir if excluir is not None else set()
+    fila = 0
+
+    for lote in pd.read_csv(path, usecols=[text_col], chunksize=chunksize):
+        originales = lote[text_col].tolist()
+        limpios = limpiar_lote(originales)
+
+        validos = [i for i, texto in enumerate(limpios) if len(texto) >= 3 and texto not in excluir]
+        if validos:
+            probs = model.predict_proba([limpios[i] for i in validos])
+            puntuaciones = incertidumbre(probs, estrategia)
+            predichas = probs.argmax(axis=1)
+
+            for j, i in enumerate(validos):
+                if limpios[i] in en_heap:
+                    continue
+                item = (float(puntuaciones[j]), fila + i, limpios[i], originales[i], int(predichas[j]))
+                if len(heap) < capacidad:
+                    heapq.heappush(heap, item)
+                elif item[0] > heap[0][0]:
+                    en_heap.discard(heapq.heapreplace(heap, item)[2])
+                else:
+                    continue
+                en_heap.add(limpios[i])
+        fila += len(originales)
+
+    if not heap:
+        return pd.DataFrame(columns=['sintomas_procesados', 'especialidad'])
+
+    candidatos = sorted(heap, reverse=True)
+    puntuaciones = np.array([c[0] for c in candidatos])
+    vectores = model[:-1].transform([c[2] for c in candidatos])
+    orden = _seleccion_diversa(vectores, puntuaciones, k)
+
+    return pd.DataFrame({
+        'sintomas_procesados': [candidatos[i][2] for i in orden],
+        'especialidad': "",  # A completar por el clínico
+        'especialidad_sugerida': le.inverse_transform([candidatos[i][4] for i in orden]),
+        'incertidumbre': puntuaciones[orden].round(4),
+        'fila_origen': [candidatos[i][1] for i in orden],
+        'texto_original': [candidatos[i][3] for i in orden],
+    })
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Propone los casos más informativos para etiquetar.")
+    parser.add_argument('path', help="CSV con notas clínicas sin etiquetar.")
+    parser.add_argument('--text-col', default='texto')
+    parser.add_argument('--k', type=int, default=config.ACTIVE_LEARNING_QUEUE_SIZE)
+    parser.add_argument('--estrategia', choices=['margen', 'entropia'], default=config.ACTIVE_LEARNING_STRATEGY)
+    parser.add_argument('--chunksize', type=int, default=config.ACTIVE_LEARNING_CHUNK_SIZE)
+    parser.add_argument('--salida', default=config.LABELING_QUEUE_FILE,
+                        help="Cola de etiquetado; si ya existe, los casos nuevos se añaden al final.")
+    args = parser.parse_args()
+
+    # No se proponen casos ya etiquetados en el corpus ni ya pendientes en la cola
+    excluir = set(cargar_corpus(columnas=['sintomas_procesados'])['sintomas_procesados'].astype(str))
+    cola_previa = pd.read_csv(args.salida) if os.path.exists(args.salida) else None
+    if cola_previa is not None:
+        excluir.update(cola_previa['sintomas_procesados'].astype(str))
+
+    model, le = load_artifacts()
+    print(f"🔎 Buscando los {args.k} casos más informativos en {args.path}...")
+    cola = seleccionar_para_etiquetar(
+        args.path, model, le, args.text_col, args.k,
+        estrategia=args.estrategia, chunksize=args.chunksize, excluir=excluir
+    )
+
+    # Nunca se sobrescribe la cola: puede tener etiquetas aún sin incorporar
+    if cola_previa is not None:
+        print(f"📋 La cola ya tenía {len(cola_previa)} casos; se añaden los nuevos al final")
+        cola = pd.concat([cola_previa, cola], ignore_index=True)
+    cola.to_csv(args.salida, index=False)
+    print(f"💾 Cola de etiquetado ({len(cola)} casos) guardada en: {args.salida}")
+    print("Completa la columna 'especialidad' y ejecuta 'python src/train.py' para incorporarlos.")
@@ -12,6 +12,7 @@ DATA_DIR = os.path.join(BASE_DIR, 'data')
 MODELS_DIR = os.path.join(BASE_DIR, 'models')
 RAW_DATA_DIR = os.path.join(DATA_DIR, 'raw')
 PROCESSED_DATA_DIR = os.path.join(DATA_DIR, 'processed')
+EXTERNAL_DATA_DIR = os.path.join(DATA_DIR, 'external')
 
 # Archivos de Datos
 # Archivo original en inglés
@@ -22,12 +23,33 @@ MTSAMPLES_TRANSLATED_FILE = os.path.join(RAW_DATA_DIR, 'mtsamples_translated.csv
 UNIFIED_DATA_FILE = os.path.join(PROCESSED_DATA_DIR, 'datos_triaje_unificados.csv')
 # Archivo final limpio listo para entrenar (NLP procesado)
 PROCESSED_DATA_FILE = os.path.join(PROCESSED_DATA_DIR, 'datos_nlp_procesados_aumentados.csv')
+# Misma información en formato columnar (Parquet) con 'especialidad' categórica
+PROCESSED_DATA_PARQUET = os.path.join(PROCESSED_DATA_DIR, 'datos_nlp_procesados_aumentados.parquet')
+# Cola de casos a etiquetar elegidos por aprendizaje activo (se suman a train.py al etiquetarse)
+LABELING_QUEUE_FILE = os.path.join(PROCESSED_DATA_DIR, 'cola_etiquetado.csv')
+
+# Reporte de casi-duplicados del corpus (MinHash/LSH)
+DEDUP_REPORT_FILE = os.path.join(EXTERNAL_DATA_DIR, 'reporte_duplicados.json')
+# Comparación del extractor con diccionario vs hashing
+HASHING_REPORT_FILE = os.path.join(EXTERNAL_DATA_DIR, 'reporte_hashing.json')
+# Reportes de evaluación por lotes (métricas JSON/texto y matriz de confusión)
+EVAL_REPORT_JSON = os.path.join(EXTERNAL_DATA_DIR, 'reporte_evaluacion.json')
+EVAL_REPORT_TXT = os.path.join(EXTERNAL_DATA_DIR, 'reporte_evaluacion.txt')
+# Archivo propio: la matriz de confusión del modelo final (notebooks) no se sobrescribe
+EVAL_CONFUSION_MATRIX_PNG = os.path.join(EXTERNAL_DATA_DIR, 'matriz_confusion_evaluacion.png')
+# Resumen de la evaluación en sombra del modelo candidato
+SHADOW_REPORT_PATH = os.path.join(EXTERNAL_DATA_DIR, 'reporte_shadow.json')
 
 # Archivos de Modelos (Artefactos)
 # El modelo SVM entrenado (Pipeline)
 MODEL_SVM_PATH = os.path.join(MODELS_DIR, 'modelo_triaje_svm.pkl')
 # El diccionario que traduce números a especialidades (0 -> Cardiología)
 LABEL_ENCODER_PATH = os.path.join(MODELS_DIR, 'label_encoder_final.pkl')
+# Modelo re-entrenado pendiente de promoción (se evalúa en sombra si existe)
+CANDIDATE_MODEL_PATH = os.path.join(MODELS_DIR, 'modelo_triaje_svm_candidato.pkl')
+CANDIDATE_LABEL_ENCODER_PATH = os.path.join(MODELS_DIR, 'label_encoder_candidato.pkl')
+# Pesos por clase precalculados del SVM lineal (explicaciones por término)
+EXPLAIN_INDEX_PATH = os.path.join(MODELS_DIR, 'indice_explicaciones.pkl')
 
 # ==========================================
 # 2. HIPERPARÁMETROS Y CONSTANTES
@@ -47,4 +69,45 @@ STOPWORDS_EXCEPTIONS = {
 # Configuración del Vectorizador (TF-IDF)
 VOCAB_SIZE = None       # Número máximo de palabras/bigramas a aprender
 NGRAM_RANGE = (1, 2)    # Usar palabras sueltas y pares de palabras
-MIN_DF = 3              # Ignorar palabras que aparezcan en menos de 3 documentos
\ No newline at end of file
+MIN_DF = 3              # Ignorar palabras que aparezcan en menos de 3 documentos
+
+# Modo de extracción de características
+# 'tfidf': vocabulario aprendido (diccionario término -> columna)
+# 'hashing': columnas por hash de ancho fijo + IDF en array plano, sin vocabulario
+FEATURE_MODE = 'tfidf'
+HASHING_N_FEATURES = 2 ** 20  # Columnas del espacio de hashing (menos colisiones cuanto mayor)
+
+# Configuración de Evaluación por lotes
+EVAL_CHUNK_SIZE = 5000  # Filas por lote al evaluar archivos etiquetados grandes
+
+# Configuración del Modelo en Sombra
+SHADOW_MAX_PENDING = 64     # Consultas en cola para el candidato; si se llena, se descartan
+SHADOW_REPORT_EVERY = 100   # El reporte se reescribe cada N evaluaciones...
+SHADOW_REPORT_SECONDS = 60  # ...o cada T segundos, para no perderlo si el proceso muere
+
+# Configuración de Explicaciones
+EXPLAIN_TOP_K = 5       # Términos más influyentes a mostrar por predicción
+
+# Configuración de Conversaciones (Chatbot multi-turno)
+CONVERSATION_MAX_TURNS = 8          # Mensajes de síntomas que se recuerdan por sesión
+CONVERSATION_MAX_SESSIONS = 1000    # Sesiones activas antes de expulsar la menos usada (LRU)
+CONVERSATION_IDLE_SECONDS = 30 * 60 # Sesiones inactivas más de 30 minutos se olvidan
+
+# Configuración de Deduplicación (MinHash + LSH)
+# 'agrupar': cada grupo de casi-duplicados queda entero en train o en test
+# 'eliminar': se conserva solo un texto por grupo. Ojo: casi todos los duplicados
+#   del corpus aumentado son copias del sobremuestreo de clases minoritarias
+#   (ver 'filas_redundantes_una_etiqueta' y 'distribucion_clases' en el reporte),
+#   así que este modo deshace ese aumento; el SVM sigue con class_weight='balanced'
+# None: sin deduplicación
+DEDUP_MODE = 'agrupar'
+DEDUP_THRESHOLD = 0.8       # Similitud de Jaccard mínima para considerar duplicados
+DEDUP_NUM_PERM = 128        # Permutaciones de la firma MinHash
+DEDUP_BANDS = 16            # Bandas LSH (16 x 8 filas -> umbral efectivo ~0.7)
+DEDUP_SHINGLE_SIZE = 3      # Palabras por shingle
+
+# Configuración de Aprendizaje Activo
+ACTIVE_LEARNING_QUEUE_SIZE = 200      # Casos que se proponen para etiquetar
+ACTIVE_LEARNING_POOL_FACTOR = 5       # Candidatos inciertos retenidos por caso (para diversidad)
+ACTIVE_LEARNING_STRATEGY = 'margen'   # 'margen' o 'entropia'
+ACTIVE_LEARNING_CHUNK_SIZE = 1000     # Filas leídas por lote del CSV sin etiquetar
@@ -0,0 +1,174 @@
+import time
+import threading
+from collections import OrderedDict, deque
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from src.config import (
+    CONVERSATION_MAX_TURNS, CONVERSATION_MAX_SESSIONS, CONVERSATION_IDLE_SECONDS
+)
+from src.features import analizador, indexador_terminos, pesos_idf
+
+
+def _contar_terminos(analizar, indice, texto_limpio):
+    """Conteos {índice: n} de los unigramas/bigramas del vocabulario en un turno."""
+    conteos = {}
+    for termino in analizar(texto_limpio):
+        idx = indice(termino)
+        if idx is not None:
+            conteos[idx] = conteos.get(idx, 0) + 1
+    return conteos
+
+
+class ConversationState:
+    """
+    Estado de una conversación: turnos limpios y conteos acumulados de términos.
+
+    Guarda los conteos (no el TF-IDF) porque son aditivos: un turno nuevo solo
+    suma sus términos y la norma L2 se ajusta con la diferencia de cuadrados,
+    sin volver a procesar los mensajes anteriores.
+    """
+
+    def __init__(self, max_turnos=CONVERSATION_MAX_TURNS):
+        self.max_turnos = max_turnos
+        self.turnos = deque()   # (texto_limpio, {indice_termino: conteo})
+        self.conteos = {}       # Conteos acumulados de toda la conversación
+        self.norma2 = 0.0       # Suma de (conteo * idf)^2
+        self.n_tokens = 0
+        self.ultimo_uso = time.monotonic()
+
+    def _sumar(self, conteos_turno, idf, signo):
+        for idx, conteo in conteos_turno.items():
+            anterior = self.conteos.get(idx, 0)
+            nuevo = anterior + signo * conteo
+            # float(): con idf float32 la suma perdería precisión turno a turno
+            peso = float(idf[idx])
+            self.norma2 += (nuevo * nuevo - anterior * anterior) * peso * peso
+            if nuevo:
+                self.conteos[idx] = nuevo
+            else:
+                del self.conteos[idx]
+
+    def agregar_turno(self, texto_limpio, conteos_turno, idf):
+        """Suma un turno nuevo y descarta el más antiguo si se supera el límite."""
+        self._sumar(conteos_turno, idf, +1)
+        self.turnos.append((texto_limpio, conteos_turno))
+        self.n_tokens += len(texto_limpio.split())
+
+        while len(self.turnos) > self.max_turnos:
+            texto_viejo, conteos_viejos = self.turnos.popleft()
+            self._sumar(conteos_viejos, idf, -1)
+            self.n_tokens -= len(texto_viejo.split())
+
+        if not self.conteos:
+            # Evita arrastrar error de redondeo cuando la conversación queda vacía
+            self.norma2 = 0.0
+        self.ultimo_uso = time.monotonic()
+
+    def vector(self, idf):
+        """
+        Fila TF-IDF (1 x n_términos) de toda la conversación, normalizada L2.
+
+        Ordena los índices en cada llamada: O(m log m) con m = términos distintos
+        de los últimos 'max_turnos' mensajes (a lo sumo unos cientos), muy por
+        debajo del coste de analizar el turno o de predecir.
+        """
+        n_features = idf.shape[0]
+        if not self.conteos or self.norma2 <= 0:
+            return csr_matrix((1, n_features))
+
+        indices = np.fromiter(sorted(self.conteos), dtype=np.int32, count=len(self.conteos))
+        conteos = np.fromiter((self.conteos[i] for i in indices), dtype=np.float64, count=indices.size)
+        datos = conteos * idf[indices] / np.sqrt(self.norma2)
+        indptr = np.array([0, indices.size], dtype=np.int32)
+        return csr_matrix((datos, indices, indptr), shape=(1, n_features))
+
+
+class ConversationStore:
+    """
+    Conversaciones activas por sesión con expulsión LRU.
+
+    Se conservan como máximo 'max_sesiones'; al superarlo se descarta la que
+    lleva más tiempo sin usarse, y las inactivas más de 'max_inactividad'
+    segundos se purgan en cada acceso.
+
+    Supone el extractor de train.py (TfidfVectorizer, o HashingVectorizer +
+    TfidfTransformer) con norm='l2', use_idf=True y sublinear_tf=False.
+    """
+
+    def __init__(self, vectorizer,
+                 max_sesiones=CONVERSATION_MAX_SESSIONS,
+                 max_turnos=CONVERSATION_MAX_TURNS,
+                 max_inactividad=CONVERSATION_IDLE_SECONDS):
+        self._analizador = analizador(vectorizer)
+        self._indice = indexador_terminos(vectorizer)
+        self._idf = pesos_idf(vectorizer)
+        self.max_sesiones = max_sesiones
+        self.max_turnos = max_turnos
+        self.max_inactividad = max_inactividad
+        self._sesiones = OrderedDict()
+        # Gradio atiende peticiones en varios hilos
+        self._lock = threading.Lock()
+
+    def _purgar_inactivas(self, ahora):
+        # El OrderedDict está ordenado por último uso: basta mirar el principio
+        while self._sesiones:
+            sesion_id, estado = next(iter(self._sesiones.items()))
+            if ahora - estado.ultimo_uso <= self.max_inactividad:
+                break
+            del self._sesiones[sesion_id]
+
+    def agregar_mensaje(self, sesion_id, texto_limpio):
+        """
+        Añade un mensaje ya limpio a la conversación de la sesión.
+
+        :param sesion_id: Identificador de la sesión (ej: session_hash de Gradio).
+        :param texto_limpio: Texto procesado (lemas separados por espacios).
+        :return: (fila TF-IDF de la conversación, tokens acumulados, turnos retenidos)
+        """
+        # El análisis del turno es lo costoso y no necesita el lock
+        conteos_turno = _contar_terminos(self._analizador, self._indice, texto_limpio)
+
+        with self._lock:
+            self._purgar_inactivas(time.monotonic())
+
+            estado = self._sesiones.get(sesion_id)
+            if estado is None:
+                estado = ConversationState(self.max_turnos)
+                self._sesiones[sesion_id] = estado
+            self._sesiones.move_to_end(sesion_id)
+
+            while len(self._sesiones) > self.max_sesiones:
+                self._sesiones.popitem(last=False)
+
+            estado.agregar_turno(texto_limpio, conteos_turno, self._idf)
+            return estado.vector(self._idf), estado.n_tokens, len(estado.turnos)
+
+    def turnos(self, sesion_id):
+        """Lista de textos limpios de los turnos retenidos de una sesión."""
+        with self._lock:
+            estado = self._sesiones.get(sesion_id)
+            return [texto for texto, _ in estado.turnos] if estado is not None else []
+
+    def reiniciar(self, sesion_id):
+        """Olvida la conversación de una sesión (ej: al despedirse el paciente)."""
+        with self._lock:
+            self._sesiones.pop(sesion_id, None)
+
+    def __len__(self):
+        return len(self._sesiones)
+
+
+def vectorizar_turnos(vectorizer, turnos):
+    """
+    Fila TF-IDF de varios turnos sumando los conteos de cada uno, igual que
+    ConversationStore. Unir los turnos en un texto crearía bigramas entre
+    el final de un mensaje y el principio del siguiente que la sesión no ve.
+    """
+    idf = pesos_idf(vectorizer)
+    analizar, indice = analizador(vectorizer), indexador_terminos(vectorizer)
+    estado = ConversationState(max_turnos=len(turnos))
+    for texto in turnos:
+        estado.agregar_turno(texto, _contar_terminos(analizar, indice, texto), idf)
+    return estado.vector(idf)
@@ -2,15 +2,22 @@ import spacy
 import re
 import sys
 import os
+import importlib.util
+import pandas as pd
 
 # Intentamos importar la configuración.
 try:
-    from src.config import STOPWORDS_EXCEPTIONS
+    from src.config import (
+        STOPWORDS_EXCEPTIONS, PROCESSED_DATA_FILE, PROCESSED_DATA_PARQUET, LABELING_QUEUE_FILE
+    )
 except ImportError:
     # Fallback por si se ejecuta como script suelto
     STOPWORDS_EXCEPTIONS = {
         'no', 'sin', 'ni', 'nunca', 'jamás', 'tampoco', 'nada', 'poco', 'apenas'
     }
+    PROCESSED_DATA_FILE = None
+    PROCESSED_DATA_PARQUET = None
+    LABELING_QUEUE_FILE = None
 
 # Variable global para el modelo (Patrón Singleton para no cargarlo mil veces)
 _nlp_model = None
@@ -62,6 +69,10 @@ def limpiar_texto_medico(texto):
     # 2. Procesamiento con Spacy
     # disable=['parser', 'ner'] acelera la carga ya que no necesitamos análisis sintáctico profundo aquí
     doc = nlp(texto.lower())
+    return _lemas_filtrados(doc)
+
+def _lemas_filtrados(doc):
+    """Lemas de un Doc de Spacy tras los filtros de limpieza, unidos por espacios."""
     tokens_limpios = []
     
     for token in doc:
@@ -74,6 +85,95 @@ def limpiar_texto_medico(texto):
             
     return " ".join(tokens_limpios)
 
+def limpiar_lote(textos, batch_size=64):
+    """
+    Igual que limpiar_texto_medico pero para muchos textos a la vez.
+    Usa nlp.pipe, que procesa por lotes y es bastante más rápido que
+    llamar a Spacy texto por texto.
+    """
+    nlp = load_spacy_model()
+    textos = [texto if isinstance(texto, str) else "" for texto in textos]
+    normalizados = (re.sub(r'[^a-zA-ZáéíóúÁÉÍÓÚñÑ\s]', ' ', texto).lower() for texto in textos)
+    return [_lemas_filtrados(doc) for doc in nlp.pipe(normalizados, batch_size=batch_size)]
+
+def guardar_corpus_columnar(df, path_parquet=PROCESSED_DATA_PARQUET):
+    """
+    Guarda el corpus procesado en Parquet con 'especialidad' como categórica.
+    Retorna False si no está instalado pyarrow (se seguirá usando el CSV).
+    """
+    df = df.copy()
+    if 'especialidad' in df.columns:
+        df['especialidad'] = df['especialidad'].astype('category')
+    try:
+        df.to_parquet(path_parquet, index=False)
+    except ImportError:
+        return False
+    return True
+
+def cargar_corpus(columnas=None, path_csv=PROCESSED_DATA_FILE, path_parquet=PROCESSED_DATA_PARQUET):
+    """
+    Carga el corpus procesado leyendo solo las columnas pedidas.
+
+    Usa la copia Parquet si existe y está al día con el CSV; si no, lee del CSV
+    solo las columnas pedidas y, si hay pyarrow, regenera aparte la copia
+    columnar completa para las siguientes cargas.
+    """
+    csv_existe = os.path.exists(path_csv)
+    parquet_al_dia = os.path.exists(path_parquet) and (
+        not csv_existe or os.path.getmtime(path_parquet) >= os.path.getmtime(path_csv)
+    )
+
+    if parquet_al_dia:
+        try:
+            return pd.read_parquet(path_parquet, columns=columnas)
+        except ImportError:
+            pass
+
+    df = pd.read_csv(path_csv, usecols=columnas, dtype={'especialidad': 'category'})
+    if columnas is None:
+        guardar_corpus_columnar(df, path_parquet)
+    elif importlib.util.find_spec('pyarrow') is not None:
+        # La copia Parquet debe tener todas las columnas, no solo las pedidas
+        guardar_corpus_columnar(pd.read_csv(path_csv, dtype={'especialidad': 'category'}), path_parquet)
+    return df
+
+def cargar_cola_etiquetada(path=LABELING_QUEUE_FILE):
+    """
+    Casos de la cola de aprendizaje activo que ya etiquetó un clínico.
+    Retorna las columnas del corpus procesado; las filas sin 'especialidad' se ignoran.
+    """
+    columnas = ['sintomas_procesados', 'especialidad']
+    if path is None or not os.path.exists(path):
+        return pd.DataFrame(columns=columnas)
+
+    cola = pd.read_csv(path, usecols=columnas)
+    etiquetada = cola['especialidad'].notna() & (cola['especialidad'].astype(str).str.strip() != "")
+    return cola.loc[etiquetada, columnas]
+
+def incorporar_cola_etiquetada(path_cola=LABELING_QUEUE_FILE, path_csv=PROCESSED_DATA_FILE,
+                               path_parquet=PROCESSED_DATA_PARQUET):
+    """
+    Mueve los casos ya etiquetados de la cola al corpus procesado.
+
+    Los añade al final del CSV, regenera la copia Parquet y deja en la cola
+    solo los casos pendientes (la borra si no queda ninguno), para que no se
+    vuelvan a sumar en el siguiente entrenamiento. Retorna cuántos se movieron.
+    """
+    revisados = cargar_cola_etiquetada(path_cola)
+    if not len(revisados):
+        return 0
+
+    # Primero el corpus: si algo falla después, se duplican casos pero no se pierden
+    revisados.to_csv(path_csv, mode='a', header=False, index=False)
+    guardar_corpus_columnar(pd.read_csv(path_csv, dtype={'especialidad': 'category'}), path_parquet)
+
+    pendientes = pd.read_csv(path_cola).drop(index=revisados.index)
+    if len(pendientes):
+        pendientes.to_csv(path_cola, index=False)
+    else:
+        os.remove(path_cola)
+    return len(revisados)
+
 # Bloque de prueba
 if __name__ == "__main__":
     texto_prueba = "El paciente NO presenta fiebre, SIN dolor de cabeza."
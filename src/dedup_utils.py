@@ -0,0 +1,210 @@
+import os
+import sys
+import json
+import time
+import zlib
+import argparse
+import numpy as np
+
+# Truco para importar módulos hermanos si se ejecuta como script
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import config
+
+# Primo mayor que 2^32: (a*h + b) % P cabe en uint64 para hashes de 32 bits
+_PRIMO = np.uint64(4294967311)
+
+
+def _hashes_shingles(texto, k):
+    """Hashes estables (crc32) de los k-gramas de palabras de un texto limpio."""
+    tokens = texto.split()
+    if len(tokens) <= k:
+        # Textos cortos: todo el texto es un único shingle
+        shingles = {" ".join(tokens)}
+    else:
+        shingles = {" ".join(tokens[i:i + k]) for i in range(len(tokens) - k + 1)}
+    return np.fromiter(
+        (zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles)
+    )
+
+
+def minhash_firmas(textos, num_perm=config.DEDUP_NUM_PERM, k=config.DEDUP_SHINGLE_SIZE,
+                   seed=config.RANDOM_STATE):
+    """
+    Calcula la firma MinHash (n_textos x num_perm) de cada texto.
+
+    Cada permutación es una función universal h(x) = (a*x + b) mod P; la firma
+    guarda el mínimo por permutación. La fracción de posiciones iguales entre
+    dos firmas estima la similitud de Jaccard de sus shingles.
+    """
+    rng = np.random.RandomState(seed)
+    a = rng.randint(1, 2**32 - 1, size=num_perm, dtype=np.uint64)[:, None]
+    b = rng.randint(0, 2**32 - 1, size=num_perm, dtype=np.uint64)[:, None]
+
+    firmas = np.empty((len(textos), num_perm), dtype=np.uint32)
+    for i, texto in enumerate(textos):
+        h = _hashes_shingles(str(texto), k)
+        firmas[i] = ((a * h[None, :] + b) % _PRIMO).min(axis=1)
+    return firmas
+
+
+def _raiz(padres, i):
+    # Union-find con compresión de caminos
+    while padres[i] != i:
+        padres[i] = padres[padres[i]]
+        i = padres[i]
+    return i
+
+
+def agrupar_lsh(firmas, bandas=config.DEDUP_BANDS, umbral=config.DEDUP_THRESHOLD):
+    """
+    Agrupa firmas casi duplicadas con LSH por bandas.
+
+    Cada banda de 'num_perm / bandas' filas se usa como clave de un cubo; dos
+    textos son candidatos si coinciden en alguna banda. Cada candidato se
+    verifica solo contra el primer miembro del cubo (no todos los pares), así
+    el coste es O(n * bandas) y no cuadrático.
+
+    :return: Array con el id de grupo de cada texto (el índice de su representante).
+    """
+    n, num_perm = firmas.shape
+    filas = num_perm // bandas
+    padres = np.arange(n)
+
+    for banda in range(bandas):
+        bloque = np.ascontiguousarray(firmas[:, banda * filas:(banda + 1) * filas])
+        cubos = {}
+        for i in range(n):
+            clave = bloque[i].tobytes()
+            primero = cubos.setdefault(clave, i)
+            if primero == i:
+                continue
+            ri, rp = _raiz(padres, i), _raiz(padres, primero)
+            if ri == rp:
+                continue
+            # Verificación: similitud de Jaccard estimada con la firma completa
+            if np.mean(firmas[i] == firmas[primero]) >= umbral:
+                padres[max(ri, rp)] = min(ri, rp)
+
+    return np.array([_raiz(padres, i) for i in range(n)])
+
+
+def detectar_duplicados(textos, num_perm=config.DEDUP_NUM_PERM, k=config.DEDUP_SHINGLE_SIZE,
+                        bandas=config.DEDUP_BANDS, umbral=config.DEDUP_THRESHOLD, max_clusters=20,
+                        etiquetas=None):
+    """
+    Detecta grupos de textos casi idénticos.
+
+    :param textos: Lista de textos ya limpios (sintomas_procesados).
+    :param max_clusters: Cuántos grupos (los más grandes) incluir en el reporte.
+    :param etiquetas: Especialidad de cada texto (opcional). Si se pasa, el reporte
+                      incluye cuántos grupos comparten una sola etiqueta y la
+                      distribución de clases antes y después de eliminar duplicados.
+    :return: (grupos, reporte) donde 'grupos' es el id de grupo de cada texto y
+             'reporte' un diccionario con tiempos, conteos y los grupos más grandes.
+    """
+    inicio = time.perf_counter()
+    firmas = minhash_firmas(textos, num_perm=num_perm, k=k)
+    t_firmas = time.perf_counter() - inicio
+    grupos = agrupar_lsh(firmas, bandas=bandas, umbral=umbral)
+    t_total = time.perf_counter() - inicio
+
+    ids, tamanos = np.unique(grupos, return_counts=True)
+    con_duplicados = np.argsort(-tamanos)
+    con_duplicados = con_duplicados[tamanos[con_duplicados] > 1]
+
+    clusters = []
+    for pos in con_duplicados[:max_clusters]:
+        miembros = np.flatnonzero(grupos == ids[pos])
+        clusters.append({
+            'representante': int(ids[pos]),
+            'tamano': int(tamanos[pos]),
+            'miembros': miembros.tolist(),
+            'ejemplo': str(textos[ids[pos]])[:200],
+        })
+
+    reporte = {
+        'n_textos': len(textos),
+        'n_grupos_duplicados': int(con_duplicados.size),
+        'n_filas_redundantes': int(len(textos) - ids.size),
+        'umbral_jaccard': umbral,
+        'num_perm': num_perm,
+        'bandas': bandas,
+        'tiempo_firmas_s': round(t_firmas, 3),
+        'tiempo_total_s': round(t_total, 3),
+        'clusters': clusters,
+    }
+    if etiquetas is not None:
+        reporte.update(_resumen_etiquetas(grupos, np.asarray(etiquetas), con_duplicados.size))
+    return grupos, reporte
+
+
+def _resumen_etiquetas(grupos, etiquetas, n_grupos_duplicados):
+    """
+    Grupos cuyos miembros comparten una sola etiqueta y distribución de clases.
+
+    En el corpus aumentado casi todos los duplicados son copias del
+    sobremuestreo de clases minoritarias: eliminarlos deshace ese aumento.
+    """
+    redundantes = grupos != np.arange(len(grupos))
+    mezclados = np.unique(grupos[etiquetas != etiquetas[grupos]])
+    en_grupo_mezclado = np.isin(grupos, mezclados)
+
+    clases, antes = np.unique(etiquetas, return_counts=True)
+    despues = np.array([np.sum(etiquetas[~redundantes] == c) for c in clases])
+    return {
+        'grupos_una_etiqueta': int(n_grupos_duplicados - mezclados.size),
+        'filas_redundantes_una_etiqueta': int((redundantes & ~en_grupo_mezclado).sum()),
+        'distribucion_clases': {
+            str(c): {'antes': int(a), 'tras_eliminar': int(d)}
+            for c, a, d in zip(clases, antes, despues)
+        },
+    }
+
+
+def mascara_sin_duplicados(grupos):
+    """Máscara booleana que conserva solo el representante de cada grupo."""
+    return grupos == np.arange(len(grupos))
+
+
+def _benchmark_entrenamiento(X, y, mascara):
+    """Mide el tiempo de entrenamiento con y sin duplicados (mismo pipeline que train.py)."""
+    from src.train import construir_pipeline
+
+    tiempos = {}
+    for nombre, filtro in [('completo', np.ones(len(X), dtype=bool)), ('sin_duplicados', mascara)]:
+        inicio = time.perf_counter()
+        construir_pipeline().fit(X[filtro], y[filtro])
+        tiempos[nombre] = round(time.perf_counter() - inicio, 2)
+    tiempos['aceleracion'] = round(tiempos['completo'] / max(tiempos['sin_duplicados'], 1e-9), 2)
+    return tiempos
+
+
+if __name__ == "__main__":
+    from src.data_utils import cargar_corpus
+    from src.train import unificar_categorias_vectorizado
+
+    parser = argparse.ArgumentParser(description="Detecta casi-duplicados en el corpus procesado.")
+    parser.add_argument('--benchmark', action='store_true',
+                        help="Entrena con y sin duplicados y reporta la aceleración.")
+    args = parser.parse_args()
+
+    df = cargar_corpus(columnas=['sintomas_procesados', 'especialidad'])
+    textos = df['sintomas_procesados'].astype(str).to_numpy()
+    etiquetas = unificar_categorias_vectorizado(df['especialidad'])
+    grupos, reporte = detectar_duplicados(textos, etiquetas=etiquetas.astype(str).to_numpy())
+
+    print(f"🧬 {reporte['n_grupos_duplicados']} grupos de casi-duplicados, "
+          f"{reporte['n_filas_redundantes']} filas redundantes de {reporte['n_textos']} "
+          f"({reporte['tiempo_total_s']:.2f}s)")
+    print(f"🏷️ {reporte['filas_redundantes_una_etiqueta']} de ellas están en grupos con una sola "
+          f"especialidad (copias del sobremuestreo que 'eliminar' quitaría)")
+
+    if args.benchmark:
+        y = etiquetas.cat.codes.to_numpy()
+        reporte['entrenamiento_s'] = _benchmark_entrenamiento(textos, y, mascara_sin_duplicados(grupos))
+        print(f"⏱️ Entrenamiento: {reporte['entrenamiento_s']}")
+
+    with open(config.DEDUP_REPORT_FILE, 'w', encoding='utf-8') as f:
+        json.dump(reporte, f, ensure_ascii=False, indent=2)
+    print(f"💾 Reporte guardado en: {config.DEDUP_REPORT_FILE}")
@@ -0,0 +1,100 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+# Truco para importar módulos hermanos si se ejecuta como script
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import config
+from src.data_utils import limpiar_texto_medico
+from src.predict import load_artifacts
+from src.report_utils import StreamingEvaluator
+from src.train import unificar_categorias_vectorizado
+
+def evaluate_file(path, model, le, chunksize=config.EVAL_CHUNK_SIZE,
+                  text_col='sintomas_procesados', label_col='especialidad', limpiar=False,
+                  latencia_por_fila=False):
+    """
+    Evalúa el modelo sobre un CSV etiquetado leyéndolo por lotes.
+
+    :param path: CSV con una columna de texto y otra de especialidad.
+    :param limpiar: True si el texto es crudo y hay que pasarlo por limpiar_texto_medico.
+    :param latencia_por_fila: True para predecir fila a fila y medir la latencia
+                              real de cada una (como en la app, mucho más lento);
+                              si no, se predice el lote entero y solo se mide el
+                              rendimiento en filas por segundo.
+    :return: (StreamingEvaluator con las métricas, filas descartadas por etiqueta desconocida)
+    """
+    evaluator = StreamingEvaluator(le.classes_)
+    indice_clase = {clase: i for i, clase in enumerate(le.classes_)}
+    descartadas = 0
+
+    lotes = pd.read_csv(path, usecols=[text_col, label_col], chunksize=chunksize,
+                        dtype={label_col: 'category'})
+    for lote in lotes:
+        # Misma ingeniería de etiquetas que en train.py, por categoría y no por fila
+        etiquetas = unificar_categorias_vectorizado(lote[label_col])
+        mapa = np.array([indice_clase.get(c, -1) for c in etiquetas.cat.categories], dtype=np.int64)
+        y_true = mapa[etiquetas.cat.codes.to_numpy()]
+
+        # Etiquetas que el modelo no conoce no se pueden evaluar
+        validas = y_true >= 0
+        descartadas += int((~validas).sum())
+        if not validas.any():
+            continue
+
+        textos = lote[text_col].astype(str)[validas]
+        inicio = time.perf_counter()
+        if latencia_por_fila:
+            y_pred = np.empty(len(textos), dtype=np.int64)
+            latencias = np.empty(len(textos))
+            for i, texto in enumerate(textos):
+                inicio_fila = time.perf_counter()
+                if limpiar:
+                    texto = limpiar_texto_medico(texto)
+                y_pred[i] = model.predict([texto])[0]
+                latencias[i] = time.perf_counter() - inicio_fila
+        else:
+            if limpiar:
+                textos = textos.map(limpiar_texto_medico)
+            y_pred = model.predict(textos)
+            latencias = None
+        evaluator.update(y_true[validas], y_pred, latencias, time.perf_counter() - inicio)
+
+    return evaluator, descartadas
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evalúa el modelo sobre un CSV etiquetado por lotes.")
+    parser.add_argument('path', help="CSV etiquetado que el modelo no haya visto al entrenar.")
+    parser.add_argument('--chunksize', type=int, default=config.EVAL_CHUNK_SIZE)
+    parser.add_argument('--text-col', default='sintomas_procesados')
+    parser.add_argument('--label-col', default='especialidad')
+    parser.add_argument('--limpiar', action='store_true',
+                        help="Aplicar limpiar_texto_medico (el texto no está procesado).")
+    parser.add_argument('--latencia-por-fila', action='store_true',
+                        help="Predecir fila a fila para medir la latencia por clase (lento).")
+    args = parser.parse_args()
+
+    if os.path.abspath(args.path) == os.path.abspath(config.PROCESSED_DATA_FILE):
+        print("⚠️ Evaluando el corpus de entrenamiento: las métricas estarán infladas.")
+
+    model, le = load_artifacts()
+    print(f"📊 Evaluando {args.path} en lotes de {args.chunksize}...")
+    evaluator, descartadas = evaluate_file(
+        args.path, model, le, args.chunksize, args.text_col, args.label_col, args.limpiar,
+        args.latencia_por_fila
+    )
+
+    report = evaluator.text_report()
+    print(report)
+    if descartadas:
+        print(f"⚠️ {descartadas} filas con especialidades desconocidas para el modelo se omitieron.")
+
+    evaluator.save_json(config.EVAL_REPORT_JSON)
+    with open(config.EVAL_REPORT_TXT, 'w', encoding='utf-8') as f:
+        f.write(report)
+    evaluator.save_confusion_matrix_png(config.EVAL_CONFUSION_MATRIX_PNG)
+    print(f"💾 Reportes guardados en: {config.EXTERNAL_DATA_DIR}")
@@ -0,0 +1,169 @@
+import os
+import pickle
+import hashlib
+import numpy as np
+from scipy.sparse import csr_matrix, vstack
+
+from src.config import EXPLAIN_INDEX_PATH, EXPLAIN_TOP_K
+from src.features import nombres_columnas, pesos_idf
+
+
+def _pesos_por_clase(clf, n_classes):
+    """
+    Convierte los coeficientes del SVM lineal en una fila de pesos por clase.
+
+    - LinearSVC / OvR: coef_ ya tiene una fila por clase.
+    - SVC(kernel='linear'): coef_ tiene una fila por par (i, j) (uno-contra-uno).
+      Una decisión positiva del par favorece a la clase i, así que el peso de
+      la clase k es la suma de sus pares como 'i' menos la de sus pares como 'j'.
+
+    Todo se hace en formato disperso: con entradas dispersas el SVC devuelve
+    coef_ disperso y en modo hashing pasarlo a denso serían cientos de MB.
+    """
+    coef = csr_matrix(clf.coef_, dtype=np.float64)
+
+    # Caso binario: una sola fila que favorece a la clase 1
+    if n_classes == 2 and coef.shape[0] == 1:
+        return vstack([-coef, coef], format='csr')
+
+    if coef.shape[0] == n_classes:
+        return coef
+
+    # Matriz (n_clases x n_pares) con +1/-1 que suma los pares de cada clase
+    filas, columnas, signos = [], [], []
+    k = 0
+    for i in range(n_classes):
+        for j in range(i + 1, n_classes):
+            filas += [i, j]
+            columnas += [k, k]
+            signos += [1.0, -1.0]
+            k += 1
+    plegado = csr_matrix((signos, (filas, columnas)), shape=(n_classes, coef.shape[0]))
+    return plegado @ coef
+
+
+def huella_modelo(vectorizer, clf):
+    """
+    Huella (sha1) de los parámetros entrenados: IDF del extractor, coef_ e
+    intercept_ del clasificador. Cambia con cualquier reentrenamiento, aunque
+    el número de columnas y las clases sean las mismas.
+    """
+    coef = csr_matrix(clf.coef_)
+    h = hashlib.sha1()
+    for parte in [pesos_idf(vectorizer), coef.data, coef.indices, coef.indptr,
+                  np.asarray(clf.intercept_), np.asarray(clf.classes_)]:
+        h.update(np.ascontiguousarray(parte).tobytes())
+    return h.hexdigest()
+
+
+def build_explanation_index(vectorizer, clf):
+    """
+    Precalcula el índice de explicaciones a partir del vectorizador y el SVM lineal.
+
+    :param vectorizer: Extractor ya entrenado (TfidfVectorizer o pipeline[:-1]).
+    :param clf: Clasificador lineal entrenado (SVC lineal o LinearSVC).
+    :return: Diccionario con los nombres de los términos (None en modo hashing),
+             una matriz CSR (n_clases x n_términos) de pesos por clase que
+             solo guarda las columnas con peso distinto de cero, y la huella
+             del modelo (huella_modelo) para validarlo al cargarlo.
+    """
+    n_classes = len(clf.classes_)
+    pesos = _pesos_por_clase(clf, n_classes).astype(np.float32)
+    pesos.eliminate_zeros()
+    # Índices ordenados por fila: explain_vector los busca con searchsorted
+    pesos.sort_indices()
+    nombres = nombres_columnas(vectorizer)
+
+    return {
+        'feature_names': np.asarray(nombres, dtype=object) if nombres is not None else None,
+        'class_weights': pesos,
+        'huella': huella_modelo(vectorizer, clf),
+    }
+
+
+def indice_compatible(index, vectorizer, clf):
+    """
+    True si el índice corresponde al vectorizador y clasificador cargados.
+
+    Compara la huella de los parámetros entrenados: un índice de otro
+    entrenamiento (ej: al promover el modelo candidato sin regenerarlo) daría
+    términos y pesos del modelo anterior. Los índices sin huella no se aceptan.
+    """
+    if index is None or 'huella' not in index:
+        return False
+    return index['huella'] == huella_modelo(vectorizer, clf)
+
+
+def cargar_o_construir_indice(vectorizer, clf, path=EXPLAIN_INDEX_PATH):
+    """
+    Carga el índice guardado si coincide con el modelo; si no, lo recalcula.
+    Lanza AttributeError si el clasificador no es lineal (no expone coef_).
+    """
+    index = load_explanation_index(path)
+    if indice_compatible(index, vectorizer, clf):
+        return index
+    if index is not None:
+        print("⚠️ El índice de explicaciones no corresponde al modelo cargado: se recalcula")
+    return build_explanation_index(vectorizer, clf)
+
+
+def save_explanation_index(index, path=EXPLAIN_INDEX_PATH):
+    """Guarda el índice de explicaciones junto al resto de artefactos."""
+    with open(path, 'wb') as f:
+        pickle.dump(index, f)
+
+
+def load_explanation_index(path=EXPLAIN_INDEX_PATH):
+    """Carga el índice de explicaciones o retorna None si aún no existe."""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def explain_vector(x_row, class_idx, index, top_k=EXPLAIN_TOP_K, nombres=None):
+    """
+    Términos que más empujan la predicción hacia 'class_idx'.
+
+    Multiplica solo los valores no nulos de la fila TF-IDF por los pesos de la
+    clase, buscados en la fila dispersa de esa clase, por lo que el coste es
+    O(nnz · log) del texto y no del vocabulario.
+
+    :param x_row: Fila dispersa (1 x n_términos) ya vectorizada.
+    :param class_idx: Índice de la clase predicha.
+    :param index: Índice generado con build_explanation_index.
+    :param top_k: Número máximo de términos a devolver.
+    :param nombres: Diccionario columna -> término del texto (features.nombres_terminos);
+                    obligatorio en modo hashing, donde no hay vocabulario global.
+    :return: Lista de tuplas (término, contribución) ordenadas de mayor a menor.
+    """
+    x_row = x_row.tocsr()
+    cols = x_row.indices
+    if cols.size == 0:
+        return []
+
+    # Fila 'class_idx' de la CSR sin copiarla: columnas (ordenadas) y pesos
+    pesos = index['class_weights']
+    inicio, fin = pesos.indptr[class_idx], pesos.indptr[class_idx + 1]
+    cols_clase, pesos_clase = pesos.indices[inicio:fin], pesos.data[inicio:fin]
+    if cols_clase.size == 0:
+        return []
+
+    pos = np.minimum(np.searchsorted(cols_clase, cols), cols_clase.size - 1)
+    pesos_texto = np.where(cols_clase[pos] == cols, pesos_clase[pos], 0.0)
+    contribuciones = x_row.data * pesos_texto
+
+    # Solo interesan los términos que suman a favor de la clase
+    positivos = np.flatnonzero(contribuciones > 0)
+    if positivos.size > top_k:
+        positivos = positivos[np.argpartition(-contribuciones[positivos], top_k - 1)[:top_k]]
+    positivos = positivos[np.argsort(-contribuciones[positivos])]
+
+    if nombres is None:
+        nombres = index['feature_names']
+    return [(nombres[cols[i]], float(contribuciones[i])) for i in positivos]
+
+
+def format_explanation(terminos):
+    """Convierte la lista de términos en texto legible: 'dolor pecho, disnea'."""
+    return ", ".join(termino for termino, _ in terminos)
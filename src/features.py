@@ -0,0 +1,181 @@
+import os
+import sys
+import json
+import time
+import pickle
+import tracemalloc
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer, TfidfTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.utils import murmurhash3_32
+
+# Truco para importar módulos hermanos si se ejecuta como script
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import config
+
+def construir_extractor(modo=config.FEATURE_MODE):
+    """
+    Pasos de extracción de características según config.FEATURE_MODE.
+
+    - 'tfidf': TfidfVectorizer con vocabulario (diccionario término -> columna).
+    - 'hashing': HashingVectorizer de ancho fijo + IDF en un array plano. No
+      guarda vocabulario: cualquier proceso calcula la columna de un término
+      con su hash, sin memoria extra ni estado que sincronizar.
+    """
+    if modo == 'tfidf':
+        return [
+            ('tfidf', TfidfVectorizer(
+                ngram_range=config.NGRAM_RANGE,
+                min_df=config.MIN_DF,
+                max_features=config.VOCAB_SIZE,
+                strip_accents='unicode'
+            )),
+        ]
+    if modo == 'hashing':
+        return [
+            ('hashing', HashingVectorizer(
+                ngram_range=config.NGRAM_RANGE,
+                n_features=config.HASHING_N_FEATURES,
+                strip_accents='unicode',
+                alternate_sign=False,  # Conteos positivos, igual que CountVectorizer
+                norm=None,             # La normalización la hace TfidfTransformer
+                dtype=np.float32       # idf_ en float32: la mitad de memoria por worker
+            )),
+            ('tfidf', TfidfTransformer()),
+        ]
+    raise ValueError(f"FEATURE_MODE desconocido: {modo}")
+
+def _pasos(extractor):
+    if isinstance(extractor, Pipeline):
+        return [paso for _, paso in extractor.steps]
+    return [extractor]
+
+def es_hashing(extractor):
+    """True si el extractor (parte del pipeline sin el clasificador) usa hashing."""
+    return isinstance(_pasos(extractor)[0], HashingVectorizer)
+
+def pesos_idf(extractor):
+    """Array plano de pesos IDF por columna (sin copiar; float32 en modo hashing)."""
+    return np.asarray(_pasos(extractor)[-1].idf_)
+
+def analizador(extractor):
+    """Función texto -> lista de unigramas/bigramas, igual que la del vectorizador."""
+    return _pasos(extractor)[0].build_analyzer()
+
+def _indice_hash(termino, n_features):
+    # Misma fórmula que HashingVectorizer (murmurhash3 con semilla 0)
+    h = murmurhash3_32(termino, seed=0)
+    if h == -2147483648:
+        return (2147483647 - (n_features - 1)) % n_features
+    return abs(h) % n_features
+
+def indexador_terminos(extractor):
+    """Función término -> columna (None si el término no está en el vocabulario)."""
+    primero = _pasos(extractor)[0]
+    if isinstance(primero, HashingVectorizer):
+        n_features = primero.n_features
+        return lambda termino: _indice_hash(termino, n_features)
+    return primero.vocabulary_.get
+
+def nombres_columnas(extractor):
+    """Nombre de cada columna, o None en modo hashing (no hay vocabulario global)."""
+    if es_hashing(extractor):
+        return None
+    return _pasos(extractor)[0].get_feature_names_out()
+
+def nombres_terminos(extractor, texto_limpio):
+    """
+    Columna -> término(s) para un texto concreto. En modo hashing es la única
+    forma de nombrar columnas; si dos términos colisionan se muestran juntos.
+
+    Acepta también una lista de turnos: se analiza cada uno por separado,
+    igual que la conversación, para no inventar bigramas entre mensajes.
+    """
+    textos = [texto_limpio] if isinstance(texto_limpio, str) else texto_limpio
+    analizar = analizador(extractor)
+    indice = indexador_terminos(extractor)
+    nombres = {}
+    for termino in (t for texto in textos for t in analizar(texto)):
+        col = indice(termino)
+        if col is None:
+            continue
+        if col not in nombres:
+            nombres[col] = termino
+        elif termino not in nombres[col].split(" / "):
+            nombres[col] += " / " + termino
+    return nombres
+
+def _bytes_en_memoria(objeto):
+    """Memoria que ocupa el objeto una vez cargado (no su tamaño serializado)."""
+    serializado = pickle.dumps(objeto)
+    tracemalloc.start()
+    try:
+        copia = pickle.loads(serializado)
+        ocupados, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del copia
+    return ocupados
+
+def comparar_modos(X_train, X_test, y_train, y_test):
+    """
+    Compara el modo diccionario y el modo hashing con el mismo split.
+
+    Reporta la tasa de colisión del hashing sobre los términos distintos de
+    train, la precisión de cada modo y la memoria que carga cada worker:
+    extractor ya cargado (medido con tracemalloc) más índice de explicaciones.
+    """
+    from sklearn.metrics import accuracy_score
+    from src.train import construir_pipeline
+    from src.explain_utils import build_explanation_index
+
+    reporte = {'n_features_hashing': config.HASHING_N_FEATURES}
+    for modo in ['tfidf', 'hashing']:
+        pipeline = construir_pipeline(modo)
+        inicio = time.perf_counter()
+        pipeline.fit(X_train, y_train)
+        tiempo = time.perf_counter() - inicio
+        pesos = build_explanation_index(pipeline[:-1], pipeline[-1])['class_weights']
+        bytes_extractor = _bytes_en_memoria(pipeline[:-1])
+        bytes_indice = pesos.data.nbytes + pesos.indices.nbytes + pesos.indptr.nbytes
+        reporte[modo] = {
+            'accuracy': float(accuracy_score(y_test, pipeline.predict(X_test))),
+            'tiempo_entrenamiento_s': round(tiempo, 2),
+            'bytes_extractor_pickle': len(pickle.dumps(pipeline[:-1])),
+            'bytes_extractor': bytes_extractor,
+            'bytes_idf': pesos_idf(pipeline[:-1]).nbytes,
+            'bytes_indice_explicaciones': bytes_indice,
+            'bytes_por_worker': bytes_extractor + bytes_indice,
+        }
+
+    # Colisiones: términos distintos de train que comparten columna con otro
+    analizar = analizador(pipeline[:-1])
+    terminos = {termino for texto in X_train for termino in analizar(texto)}
+    columnas = np.array([_indice_hash(t, config.HASHING_N_FEATURES) for t in terminos])
+    _, por_columna = np.unique(columnas, return_counts=True)
+    reporte['terminos_distintos'] = len(terminos)
+    reporte['tasa_colision'] = float(por_columna[por_columna > 1].sum() / len(terminos))
+    return reporte
+
+if __name__ == "__main__":
+    from src.data_utils import cargar_corpus
+    from src.dedup_utils import detectar_duplicados
+    from src.train import unificar_categorias_vectorizado, dividir_train_test
+
+    df = cargar_corpus(columnas=['sintomas_procesados', 'especialidad'])
+    X = df['sintomas_procesados'].astype(str)
+    y = unificar_categorias_vectorizado(df['especialidad']).cat.codes.to_numpy()
+    grupos = detectar_duplicados(X.tolist())[0] if config.DEDUP_MODE == 'agrupar' else None
+
+    print("⚖️ Comparando extractor con diccionario vs hashing (entrena ambos modelos)...")
+    reporte = comparar_modos(*dividir_train_test(X, y, grupos))
+    print(f"🔢 Tasa de colisión: {reporte['tasa_colision']:.2%} de {reporte['terminos_distintos']} términos")
+    for modo in ['tfidf', 'hashing']:
+        print(f"🏆 {modo}: precisión {reporte[modo]['accuracy']*100:.2f}%, "
+              f"extractor {reporte[modo]['bytes_extractor'] / 1e6:.1f} MB en memoria, "
+              f"por worker {reporte[modo]['bytes_por_worker'] / 1e6:.1f} MB")
+
+    with open(config.HASHING_REPORT_FILE, 'w', encoding='utf-8') as f:
+        json.dump(reporte, f, ensure_ascii=False, indent=2)
+    print(f"💾 Reporte guardado en: {config.HASHING_REPORT_FILE}")
@@ -8,6 +8,10 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from src import config
 from src.data_utils import limpiar_texto_medico
+from src.features import es_hashing, nombres_terminos
+from src.explain_utils import (
+    cargar_o_construir_indice, explain_vector, format_explanation
+)
 
 def load_artifacts():
     """Carga el modelo y el codificador de etiquetas."""
@@ -23,20 +27,29 @@ def load_artifacts():
         
     return model, le
 
-def predict_single(text, model, le):
+def predict_single(text, model, le, explain_index=None, top_k=config.EXPLAIN_TOP_K):
     """
     Realiza una predicción para un solo texto.
     Retorna: (Especialidad, Confianza, Texto_Procesado)
+    Si se pasa 'explain_index', agrega al final la lista de términos más influyentes:
+    (Especialidad, Confianza, Texto_Procesado, Terminos)
     """
     # 1. Limpieza usando función centralizada
     text_clean = limpiar_texto_medico(text)
     
     if not text_clean or len(text_clean) < 3:
+        if explain_index is not None:
+            return None, 0.0, text_clean, []
         return None, 0.0, text_clean
 
     # 2. Predicción
-    # Nota: Como es un pipeline, le pasamos el texto directo (en una lista)
-    pred_probs = model.predict_proba([text_clean])
+    if explain_index is None:
+        # Nota: Como es un pipeline, le pasamos el texto directo (en una lista)
+        pred_probs = model.predict_proba([text_clean])
+    else:
+        # Vectorizamos una sola vez y reutilizamos la fila para la explicación
+        x_row = model[:-1].transform([text_clean])
+        pred_probs = model[-1].predict_proba(x_row)
     
     # 3. Obtener la clase con mayor probabilidad
     max_idx = np.argmax(pred_probs)
@@ -45,12 +58,20 @@ def predict_single(text, model, le):
     # 4. Decodificar el número a nombre (0 -> 'CARDIOLOGÍA')
     specialty = le.inverse_transform([max_idx])[0]
     
+    if explain_index is not None:
+        # En modo hashing los nombres salen de los propios términos del texto
+        nombres = nombres_terminos(model[:-1], text_clean) if es_hashing(model[:-1]) else None
+        terms = explain_vector(x_row, max_idx, explain_index, top_k, nombres)
+        return specialty, confidence, text_clean, terms
+
     return specialty, confidence, text_clean
 
 def interactive_mode():
     """Bucle infinito para probar frases en la consola."""
     try:
         model, le = load_artifacts()
+        # Se recalcula una vez al arrancar si falta o no corresponde al modelo
+        explain_index = cargar_o_construir_indice(model[:-1], model[-1], config.EXPLAIN_INDEX_PATH)
         print("\n" + "="*50)
         print("🤖 SISTEMA DE TRIAJE INTELIGENTE (Modo Consola)")
         print("Escribe los síntomas del paciente (o 'salir' para terminar).")
@@ -63,12 +84,14 @@ def interactive_mode():
                 print("👋 ¡Hasta luego!")
                 break
             
-            specialty, conf, clean_text = predict_single(user_input, model, le)
+            specialty, conf, clean_text, terms = predict_single(user_input, model, le, explain_index)
             
             if specialty:
                 print(f"⚙️ Procesado: '{clean_text}'")
                 print(f"🏥 Especialidad: {specialty}")
                 print(f"📊 Confianza: {conf:.2%}")
+                if terms:
+                    print(f"🔍 Términos clave: {format_explanation(terms)}")
             else:
                 print("⚠️ Texto insuficiente o no válido. Intenta ser más descriptivo.")
                 
@@ -1,3 +1,5 @@
+import json
+import numpy as np
 from sklearn.metrics import classification_report
 
 def generate_full_report(y_true, y_pred, target_names=None):
@@ -20,4 +22,190 @@ def generate_full_report(y_true, y_pred, target_names=None):
     
     print(report)
     print("------------------------------------------\n")
-    return report
\ No newline at end of file
+    return report
+
+
+# Bordes (en segundos) del histograma de latencias: de 1 µs a ~10 s en escala logarítmica
+_LATENCY_BINS = np.logspace(-6, 1, 57)
+
+
+class StreamingEvaluator:
+    """
+    Evaluación incremental por lotes con memoria constante.
+
+    Solo acumula la matriz de confusión (n_clases x n_clases) y un histograma
+    de latencias por clase, así que evaluar un millón de filas ocupa lo mismo
+    que evaluar mil.
+    """
+
+    def __init__(self, target_names):
+        """
+        :param target_names: Nombres de las clases en el orden de sus índices
+                             (ej: label_encoder.classes_).
+        """
+        self.target_names = [str(nombre) for nombre in target_names]
+        n = len(self.target_names)
+        self.confusion = np.zeros((n, n), dtype=np.int64)
+        self.latency_sum = np.zeros(n)
+        self.latency_max = np.zeros(n)
+        self.latency_hist = np.zeros((n, len(_LATENCY_BINS) + 1), dtype=np.int64)
+        self.n_chunks = 0
+        self.batch_rows = 0
+        self.batch_seconds = 0.0
+
+    @property
+    def n_samples(self):
+        return int(self.confusion.sum())
+
+    def update(self, y_true, y_pred, latency_s=None, batch_s=None):
+        """
+        Acumula un lote de predicciones.
+
+        :param y_true: Índices de las clases verdaderas del lote.
+        :param y_pred: Índices de las clases predichas del lote.
+        :param latency_s: Latencia medida de cada fila (segundos), en el mismo
+                          orden; se asigna a la clase predicha de la fila.
+        :param batch_s: Tiempo total del lote (segundos), para el rendimiento
+                        en filas por segundo.
+        """
+        y_true = np.asarray(y_true, dtype=np.int64)
+        y_pred = np.asarray(y_pred, dtype=np.int64)
+        if y_true.size == 0:
+            return
+        n = len(self.target_names)
+
+        # Matriz de confusión del lote en un solo bincount
+        self.confusion += np.bincount(y_true * n + y_pred, minlength=n * n).reshape(n, n)
+
+        if latency_s is not None:
+            latency_s = np.asarray(latency_s, dtype=float)
+            self.latency_sum += np.bincount(y_pred, weights=latency_s, minlength=n)
+            np.maximum.at(self.latency_max, y_pred, latency_s)
+            np.add.at(self.latency_hist, (y_pred, np.searchsorted(_LATENCY_BINS, latency_s)), 1)
+
+        if batch_s is not None:
+            self.batch_rows += y_true.size
+            self.batch_seconds += batch_s
+
+        self.n_chunks += 1
+
+    def _latency_percentile(self, clase, q):
+        # Percentil aproximado: borde superior del bin del histograma, sin
+        # pasar del máximo observado (los bins miden ~33% de ancho)
+        conteos = self.latency_hist[clase]
+        total = conteos.sum()
+        if total == 0:
+            return None
+        pos = np.searchsorted(np.cumsum(conteos), q * total)
+        borde = _LATENCY_BINS[min(pos, len(_LATENCY_BINS) - 1)]
+        return float(min(borde, self.latency_max[clase]))
+
+    def to_dict(self):
+        """Métricas acumuladas (precisión, recall, f1, soporte y latencias) por clase."""
+        tp = np.diag(self.confusion).astype(float)
+        soporte = self.confusion.sum(axis=1)
+        predichas = self.confusion.sum(axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            precision = np.nan_to_num(tp / predichas)
+            recall = np.nan_to_num(tp / soporte)
+            f1 = np.nan_to_num(2 * precision * recall / (precision + recall))
+
+        total = max(self.n_samples, 1)
+        clases = {}
+        for i, nombre in enumerate(self.target_names):
+            clases[nombre] = {
+                'precision': float(precision[i]),
+                'recall': float(recall[i]),
+                'f1-score': float(f1[i]),
+                'support': int(soporte[i]),
+                'predicted': int(predichas[i]),
+                'latency_mean_ms': None,
+                'latency_p95_ms': None,
+                'latency_max_ms': None,
+            }
+            con_latencia = self.latency_hist[i].sum()
+            if con_latencia:
+                clases[nombre]['latency_mean_ms'] = float(self.latency_sum[i] / con_latencia * 1e3)
+                clases[nombre]['latency_p95_ms'] = self._latency_percentile(i, 0.95) * 1e3
+                clases[nombre]['latency_max_ms'] = float(self.latency_max[i] * 1e3)
+
+        return {
+            'n_samples': self.n_samples,
+            'n_chunks': self.n_chunks,
+            'throughput_rows_s': self.batch_rows / self.batch_seconds if self.batch_seconds > 0 else None,
+            'accuracy': float(tp.sum() / total),
+            'macro avg': {
+                'precision': float(precision.mean()),
+                'recall': float(recall.mean()),
+                'f1-score': float(f1.mean()),
+                'support': self.n_samples,
+            },
+            'weighted avg': {
+                'precision': float((precision * soporte).sum() / total),
+                'recall': float((recall * soporte).sum() / total),
+                'f1-score': float((f1 * soporte).sum() / total),
+                'support': self.n_samples,
+            },
+            'classes': clases,
+            'confusion_matrix': self.confusion.tolist(),
+        }
+
+    def text_report(self, digits=2):
+        """Reporte de texto con el mismo formato que sklearn, más la latencia media por clase y el rendimiento."""
+        datos = self.to_dict()
+        ancho = max(len(nombre) for nombre in self.target_names + ['weighted avg'])
+        cabecera = f"{'':>{ancho}} {'precision':>9} {'recall':>9} {'f1-score':>9} {'support':>9} {'lat(ms)':>9}"
+        lineas = [cabecera, ""]
+
+        for nombre in self.target_names:
+            c = datos['classes'][nombre]
+            latencia = f"{c['latency_mean_ms']:.3f}" if c['latency_mean_ms'] is not None else "-"
+            lineas.append(
+                f"{nombre:>{ancho}} {c['precision']:>9.{digits}f} {c['recall']:>9.{digits}f} "
+                f"{c['f1-score']:>9.{digits}f} {c['support']:>9} {latencia:>9}"
+            )
+
+        lineas.append("")
+        lineas.append(f"{'accuracy':>{ancho}} {'':>9} {'':>9} {datos['accuracy']:>9.{digits}f} {datos['n_samples']:>9}")
+        for media in ['macro avg', 'weighted avg']:
+            m = datos[media]
+            lineas.append(
+                f"{media:>{ancho}} {m['precision']:>9.{digits}f} {m['recall']:>9.{digits}f} "
+                f"{m['f1-score']:>9.{digits}f} {m['support']:>9}"
+            )
+        if datos['throughput_rows_s'] is not None:
+            lineas.append("")
+            lineas.append(f"{'filas/s':>{ancho}} {datos['throughput_rows_s']:>9.0f}")
+        return "\n".join(lineas) + "\n"
+
+    def save_json(self, path):
+        """Guarda las métricas acumuladas en JSON."""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    def save_confusion_matrix_png(self, path):
+        """Dibuja la matriz de confusión normalizada por fila (como la de los notebooks)."""
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+
+        soporte = self.confusion.sum(axis=1, keepdims=True)
+        normalizada = np.divide(self.confusion, soporte, out=np.zeros(self.confusion.shape), where=soporte > 0)
+
+        fig, ax = plt.subplots(figsize=(12, 10))
+        im = ax.imshow(normalizada, cmap='Blues', vmin=0, vmax=1)
+        fig.colorbar(im, ax=ax)
+        ax.set_xticks(range(len(self.target_names)))
+        ax.set_yticks(range(len(self.target_names)))
+        ax.set_xticklabels(self.target_names, rotation=45, ha='right')
+        ax.set_yticklabels(self.target_names)
+        for i in range(normalizada.shape[0]):
+            for j in range(normalizada.shape[1]):
+                ax.text(j, i, f"{normalizada[i, j]:.2f}", ha='center', va='center',
+                        color='white' if normalizada[i, j] > 0.5 else 'black', fontsize=8)
+        ax.set_xlabel('Predicción')
+        ax.set_ylabel('Real')
+        ax.set_title(f'Matriz de Confusión ({self.n_samples} registros)')
+        fig.tight_layout()
+        fig.savefig(path, dpi=120)
+        plt.close(fig)
@@ -0,0 +1,174 @@
+import os
+import json
+import time
+import queue
+import pickle
+import threading
+from collections import Counter, deque
+
+import numpy as np
+from sklearn.pipeline import Pipeline
+
+from src.config import (
+    SHADOW_MAX_PENDING, SHADOW_REPORT_PATH, SHADOW_REPORT_EVERY, SHADOW_REPORT_SECONDS
+)
+from src.conversation import vectorizar_turnos
+
+
+class ShadowEvaluator:
+    """
+    Evalúa un modelo candidato "en sombra" con el tráfico real.
+
+    La petición principal solo encola los turnos ya limpios y la especialidad
+    que respondió el modelo en producción (put_nowait, nunca espera). Un hilo en
+    segundo plano ejecuta el candidato y acumula coincidencias, desacuerdos por
+    clase y latencias. Si la cola está llena se descarta el trabajo en sombra:
+    bajo carga se pierde evaluación, no tiempo de respuesta.
+
+    Si se indica 'ruta_reporte', el propio hilo reescribe el resumen cada
+    'reporte_cada' evaluaciones o 'reporte_segundos' segundos, así que un
+    SIGTERM o una caída solo pierden lo evaluado desde la última escritura.
+    """
+
+    def __init__(self, model, label_encoder, max_pendientes=SHADOW_MAX_PENDING,
+                 ruta_reporte=None, reporte_cada=SHADOW_REPORT_EVERY,
+                 reporte_segundos=SHADOW_REPORT_SECONDS):
+        self.model = model
+        self.label_encoder = label_encoder
+        # Con un pipeline, el candidato vectoriza la conversación igual que la
+        # app (conteos sumados por turno); si no, recibe los turnos unidos
+        self._extractor = model[:-1] if isinstance(model, Pipeline) else None
+        self._cola = queue.Queue(maxsize=max_pendientes)
+        self._lock = threading.Lock()
+        # El hilo y el atexit de la app pueden guardar a la vez el mismo archivo
+        self._lock_reporte = threading.Lock()
+
+        self.ruta_reporte = ruta_reporte
+        self.reporte_cada = reporte_cada
+        self.reporte_segundos = reporte_segundos
+        self._eventos_guardados = 0
+        self._ultimo_guardado = time.monotonic()
+
+        self.evaluadas = 0
+        self.coincidencias = 0
+        self.descartadas = 0
+        self.errores = 0
+        self.desacuerdos = Counter()        # (principal, candidato) -> veces
+        self.latencias = deque(maxlen=1000) # Ventana reciente para percentiles
+
+        self._hilo = threading.Thread(target=self._trabajar, name="shadow-model", daemon=True)
+        self._hilo.start()
+
+    @classmethod
+    def from_paths(cls, model_path, encoder_path, max_pendientes=SHADOW_MAX_PENDING, **kwargs):
+        """
+        Carga el candidato desde disco; retorna None si no hay candidato que evaluar.
+        Los argumentos extra (ruta_reporte, reporte_cada, ...) pasan al constructor.
+        """
+        if not os.path.exists(model_path) or not os.path.exists(encoder_path):
+            return None
+        with open(model_path, 'rb') as f:
+            model = pickle.load(f)
+        with open(encoder_path, 'rb') as f:
+            label_encoder = pickle.load(f)
+        return cls(model, label_encoder, max_pendientes, **kwargs)
+
+    def enviar(self, turnos, especialidad_principal):
+        """
+        Encola una consulta para el candidato sin bloquear.
+
+        :param turnos: Textos limpios de los turnos retenidos de la conversación
+                       (un solo elemento si no hay sesión).
+        :return: False si se descartó por estar la cola llena.
+        """
+        try:
+            self._cola.put_nowait((list(turnos), especialidad_principal))
+            return True
+        except queue.Full:
+            with self._lock:
+                self.descartadas += 1
+            return False
+
+    def _guardar_si_toca(self):
+        if self.ruta_reporte is None:
+            return
+        with self._lock:
+            cambios = self.evaluadas + self.descartadas + self.errores - self._eventos_guardados
+        if not cambios:
+            return
+        vencido = time.monotonic() - self._ultimo_guardado >= self.reporte_segundos
+        if cambios >= self.reporte_cada or vencido:
+            try:
+                self.guardar_reporte(self.ruta_reporte)
+            except OSError:
+                pass  # Se reintenta en la próxima ocasión; nunca tumba el hilo
+            self._eventos_guardados += cambios
+            self._ultimo_guardado = time.monotonic()
+
+    def _predecir(self, turnos):
+        if self._extractor is not None:
+            return self.model[-1].predict(vectorizar_turnos(self._extractor, turnos))
+        # Sin pipeline no se conoce el extractor: unir los turnos añade bigramas
+        # entre mensajes que el modelo principal no ve (sesgo leve y aceptado)
+        return self.model.predict([" ".join(turnos)])
+
+    def _trabajar(self):
+        while True:
+            # El timeout permite guardar por tiempo aunque no llegue tráfico
+            try:
+                turnos, especialidad_principal = self._cola.get(timeout=self.reporte_segundos)
+            except queue.Empty:
+                self._guardar_si_toca()
+                continue
+            try:
+                inicio = time.perf_counter()
+                prediccion = self._predecir(turnos)
+                especialidad = str(self.label_encoder.inverse_transform(prediccion)[0])
+                latencia = time.perf_counter() - inicio
+            except Exception:
+                with self._lock:
+                    self.errores += 1
+                self._guardar_si_toca()
+                continue
+
+            with self._lock:
+                self.evaluadas += 1
+                self.latencias.append(latencia)
+                if especialidad == especialidad_principal:
+                    self.coincidencias += 1
+                else:
+                    self.desacuerdos[(especialidad_principal, especialidad)] += 1
+            self._guardar_si_toca()
+
+    def resumen(self, top=10):
+        """Tasa de acuerdo, desacuerdos más frecuentes y latencia del candidato."""
+        with self._lock:
+            latencias = np.array(self.latencias)
+            resumen = {
+                'evaluadas': self.evaluadas,
+                'descartadas': self.descartadas,
+                'errores': self.errores,
+                'pendientes': self._cola.qsize(),
+                'tasa_acuerdo': self.coincidencias / self.evaluadas if self.evaluadas else None,
+                'desacuerdos': [
+                    {'principal': principal, 'candidato': candidato, 'veces': veces}
+                    for (principal, candidato), veces in self.desacuerdos.most_common(top)
+                ],
+            }
+        if latencias.size:
+            resumen['latencia_candidato_ms'] = {
+                'media': float(latencias.mean() * 1e3),
+                'p50': float(np.percentile(latencias, 50) * 1e3),
+                'p95': float(np.percentile(latencias, 95) * 1e3),
+                'max': float(latencias.max() * 1e3),
+            }
+        return resumen
+
+    def guardar_reporte(self, path=SHADOW_REPORT_PATH):
+        """Guarda el resumen en JSON (por defecto en data/external)."""
+        # Archivo temporal + replace: una caída a mitad de escritura no deja un JSON roto
+        temporal = f"{path}.tmp"
+        with self._lock_reporte:
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(self.resumen(top=50), f, ensure_ascii=False, indent=2)
+            os.replace(temporal, path)
@@ -3,12 +3,12 @@ import numpy as np
 import pickle
 import os
 import sys
+import time
 
 # Truco para permitir importaciones relativas si se ejecuta esto como script
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from sklearn.model_selection import train_test_split
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.model_selection import train_test_split, StratifiedGroupKFold
 from sklearn.svm import SVC
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import LabelEncoder
@@ -16,7 +16,12 @@ from sklearn.metrics import classification_report, accuracy_score
 
 # Importamos nuestra configuración y utilidades
 from src import config
-from src.data_utils import limpiar_texto_medico
+from src.data_utils import (
+    limpiar_texto_medico, cargar_corpus, cargar_cola_etiquetada, incorporar_cola_etiquetada
+)
+from src.dedup_utils import detectar_duplicados, mascara_sin_duplicados
+from src.features import construir_extractor
+from src.explain_utils import build_explanation_index, save_explanation_index
 
 def unificar_categorias(especialidad):
     """
@@ -47,64 +52,131 @@ def unificar_categorias(especialidad):
         
     return especialidad
 
+def unificar_categorias_vectorizado(especialidades):
+    """
+    Versión vectorizada de unificar_categorias para una columna completa.
+
+    Aplica la regla solo una vez por categoría distinta y reasigna los códigos
+    con un indexado de numpy, en lugar de procesar fila por fila.
+    Las categorías resultantes quedan ordenadas alfabéticamente, igual que
+    las clases de un LabelEncoder, por lo que sus códigos sirven como 'y'.
+    """
+    categorica = especialidades.astype('category')
+    originales = list(categorica.cat.categories)
+    unificadas = [unificar_categorias(c) for c in originales]
+
+    codigos = categorica.cat.codes.to_numpy()
+    if (codigos < 0).any():
+        # Los nulos tienen código -1: los ponemos al final del mapa para que
+        # mapa[-1] les dé la misma etiqueta que unificar_categorias(NaN)
+        unificadas.append(unificar_categorias(np.nan))
+
+    nuevas = sorted(set(unificadas))
+    posicion = {categoria: i for i, categoria in enumerate(nuevas)}
+    mapa = np.array([posicion[u] for u in unificadas], dtype=np.int32)
+
+    resultado = pd.Categorical.from_codes(mapa[codigos], categories=nuevas)
+    return pd.Series(resultado, index=especialidades.index).cat.remove_unused_categories()
+
+def construir_pipeline(modo=config.FEATURE_MODE):
+    """Pipeline Extractor de características + SVM con los parámetros de config.py."""
+    # Usamos los parámetros de config.py para mantener consistencia
+    return Pipeline(construir_extractor(modo) + [
+        ('svm', SVC(
+            C=10, 
+            kernel='linear', 
+            class_weight='balanced', 
+            probability=True,  # Necesario para mostrar % de confianza
+            random_state=config.RANDOM_STATE
+        ))
+    ])
+
+def dividir_train_test(X, y, grupos=None):
+    """
+    Split estratificado. Con 'grupos', cada grupo de casi-duplicados cae
+    entero en train o en test para no inflar la evaluación.
+    """
+    if grupos is None:
+        return train_test_split(
+            X, y, 
+            test_size=config.TEST_SIZE, 
+            random_state=config.RANDOM_STATE,
+            stratify=y
+        )
+
+    splitter = StratifiedGroupKFold(
+        n_splits=round(1 / config.TEST_SIZE),
+        shuffle=True,
+        random_state=config.RANDOM_STATE
+    )
+    idx_train, idx_test = next(splitter.split(X, y, grupos))
+    return X.iloc[idx_train], X.iloc[idx_test], y[idx_train], y[idx_test]
+
 def train():
     print("🚀 Iniciando proceso de entrenamiento automatizado...")
     
     # 1. Cargar Datos Procesados
-    if not os.path.exists(config.PROCESSED_DATA_FILE):
+    if not os.path.exists(config.PROCESSED_DATA_FILE) and not os.path.exists(config.PROCESSED_DATA_PARQUET):
         print(f"❌ Error: No se encuentra el archivo {config.PROCESSED_DATA_FILE}")
         print("Ejecuta primero los notebooks de obtención y preprocesamiento.")
         return
 
-    df = pd.read_csv(config.PROCESSED_DATA_FILE)
+    # Solo las dos columnas que usa el modelo (Parquet si está disponible)
+    df = cargar_corpus(columnas=['sintomas_procesados', 'especialidad'])
     print(f"📄 Datos cargados: {len(df)} registros.")
 
+    # Casos de la cola de aprendizaje activo que ya etiquetaron los clínicos
+    revisados = cargar_cola_etiquetada(config.LABELING_QUEUE_FILE)
+    if len(revisados):
+        df = pd.concat([df, revisados], ignore_index=True)
+        print(f"🩺 Añadidos {len(revisados)} casos etiquetados desde {config.LABELING_QUEUE_FILE}")
+
     # 2. Refinamiento de Etiquetas (Label Engineering)
     print("🔧 Refinando y unificando etiquetas...")
-    df['especialidad_final'] = df['especialidad'].apply(unificar_categorias)
+    df['especialidad_final'] = unificar_categorias_vectorizado(df['especialidad'])
     
     # 3. Preparación de X e y
     X = df['sintomas_procesados'].astype(str) # Texto limpio
-    y_labels = df['especialidad_final']       # Etiquetas texto
+    y_labels = df['especialidad_final']       # Etiquetas categóricas
 
-    # Codificar etiquetas a números
+    # Codificar etiquetas a números: las categorías ya están ordenadas como
+    # en LabelEncoder, así que sus códigos son directamente las clases
     le = LabelEncoder()
-    y = le.fit_transform(y_labels)
+    le.fit(y_labels.cat.categories)
+    y = y_labels.cat.codes.to_numpy()
     
     # Guardar LabelEncoder (CRÍTICO para la App)
     with open(config.LABEL_ENCODER_PATH, 'wb') as f:
         pickle.dump(le, f)
     print(f"💾 LabelEncoder actualizado y guardado en {config.LABEL_ENCODER_PATH}")
     
-    # 4. Split (Train/Test)
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, 
-        test_size=config.TEST_SIZE, 
-        random_state=config.RANDOM_STATE,
-        stratify=y
-    )
+    # 4. Deduplicación (MinHash/LSH) y Split (Train/Test)
+    grupos = None
+    if config.DEDUP_MODE:
+        grupos, reporte = detectar_duplicados(X.tolist(), etiquetas=y)
+        print(f"🧬 Casi-duplicados: {reporte['n_grupos_duplicados']} grupos, "
+              f"{reporte['n_filas_redundantes']} filas redundantes ({reporte['tiempo_total_s']:.2f}s)")
+        if config.DEDUP_MODE == 'eliminar':
+            if reporte['filas_redundantes_una_etiqueta']:
+                print(f"⚠️ {reporte['filas_redundantes_una_etiqueta']} filas a eliminar están en grupos con "
+                      f"una sola especialidad: probablemente son el sobremuestreo del corpus aumentado")
+                for codigo, conteo in reporte['distribucion_clases'].items():
+                    print(f"   {le.classes_[int(codigo)]}: {conteo['antes']} -> {conteo['tras_eliminar']}")
+            mascara = mascara_sin_duplicados(grupos)
+            X, y, grupos = X[mascara], y[mascara], None
+            print(f"🧹 Registros tras eliminar duplicados: {len(X)}")
+
+    X_train, X_test, y_train, y_test = dividir_train_test(X, y, grupos)
     
     # 5. Construcción del Pipeline (Vectorizador + Modelo SVM)
-    # Usamos los parámetros de config.py para mantener consistencia
-    pipeline = Pipeline([
-        ('tfidf', TfidfVectorizer(
-            ngram_range=config.NGRAM_RANGE,
-            min_df=config.MIN_DF,
-            max_features=config.VOCAB_SIZE,
-            strip_accents='unicode'
-        )),
-        ('svm', SVC(
-            C=10, 
-            kernel='linear', 
-            class_weight='balanced', 
-            probability=True,  # Necesario para mostrar % de confianza
-            random_state=config.RANDOM_STATE
-        ))
-    ])
+    print(f"🧩 Modo de características: {config.FEATURE_MODE}")
+    pipeline = construir_pipeline()
 
     # 6. Entrenamiento
     print("🧠 Entrenando modelo SVM (esto puede tardar unos segundos)...")
+    inicio = time.perf_counter()
     pipeline.fit(X_train, y_train)
+    print(f"⏱️ Tiempo de entrenamiento: {time.perf_counter() - inicio:.1f}s ({len(X_train)} registros)")
     
     # 7. Evaluación rápida
     print("📊 Evaluando modelo...")
@@ -117,5 +189,15 @@ def train():
         pickle.dump(pipeline, f)
     print(f"✅ Modelo guardado exitosamente en: {config.MODEL_SVM_PATH}")
 
+    # 9. Índice de explicaciones (pesos por clase del SVM lineal)
+    explain_index = build_explanation_index(pipeline[:-1], pipeline[-1])
+    save_explanation_index(explain_index, config.EXPLAIN_INDEX_PATH)
+    print(f"💾 Índice de explicaciones guardado en: {config.EXPLAIN_INDEX_PATH}")
+
+    # 10. Los casos revisados pasan al corpus y salen de la cola
+    if len(revisados):
+        movidos = incorporar_cola_etiquetada(config.LABELING_QUEUE_FILE)
+        print(f"📥 {movidos} casos etiquetados incorporados a {config.PROCESSED_DATA_FILE}")
+
 if __name__ == "__main__":
     train()
\ No newline at end of file
@@ -0,0 +1,106 @@
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+pytest.importorskip("sklearn")
+
+from sklearn.feature_extraction.text import (
+    CountVectorizer, HashingVectorizer, TfidfTransformer, TfidfVectorizer
+)
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import normalize
+
+# Truco para importar los módulos de src al ejecutar pytest desde la raíz
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.conversation import ConversationStore, vectorizar_turnos
+
+CORPUS = [
+    "dolor pecho irradiado brazo izquierdo",
+    "dolor cabeza intenso nausea vomito",
+    "fiebre tos seca dolor garganta",
+    "dolor abdominal nausea diarrea",
+    "vision borrosa dolor ojo",
+    "dolor rodilla tras caida",
+    "disnea dolor pecho sudoracion",
+    "cefalea vision borrosa mareo",
+]
+
+TURNOS = [
+    "dolor pecho",
+    "disnea sudoracion",
+    "dolor brazo izquierdo",
+    "mareo vision borrosa",
+]
+
+
+def _extractores():
+    tfidf = TfidfVectorizer(ngram_range=(1, 2)).fit(CORPUS)
+    hashing = Pipeline([
+        ('hashing', HashingVectorizer(ngram_range=(1, 2), n_features=2 ** 12,
+                                      alternate_sign=False, norm=None, dtype=np.float32)),
+        ('tfidf', TfidfTransformer()),
+    ]).fit(CORPUS)
+    return {'tfidf': tfidf, 'hashing': hashing}
+
+
+def _referencia(extractor, turnos):
+    """TF-IDF por lotes: conteos de cada turno por separado, sumados, por IDF y L2."""
+    if isinstance(extractor, Pipeline):
+        contador, idf = extractor[0], extractor[-1].idf_
+    else:
+        contador = CountVectorizer(ngram_range=(1, 2), vocabulary=extractor.vocabulary_)
+        idf = extractor.idf_
+    conteos = np.asarray(contador.transform(turnos).sum(axis=0), dtype=np.float64).ravel()
+    return normalize((conteos * idf).reshape(1, -1))
+
+
+@pytest.fixture(params=['tfidf', 'hashing'])
+def extractor(request):
+    return _extractores()[request.param]
+
+
+def test_un_turno_igual_que_transform(extractor):
+    store = ConversationStore(extractor)
+    fila, n_tokens, n_turnos = store.agregar_mensaje("s1", TURNOS[0])
+    np.testing.assert_allclose(fila.toarray(), extractor.transform([TURNOS[0]]).toarray(), atol=1e-12)
+    assert (n_tokens, n_turnos) == (2, 1)
+
+
+def test_varios_turnos_igual_que_lote(extractor):
+    store = ConversationStore(extractor, max_turnos=len(TURNOS))
+    for i, turno in enumerate(TURNOS, start=1):
+        fila, _, n_turnos = store.agregar_mensaje("s1", turno)
+        assert n_turnos == i
+        np.testing.assert_allclose(fila.toarray(), _referencia(extractor, TURNOS[:i]), atol=1e-12)
+
+
+def test_turnos_antiguos_se_descartan(extractor):
+    store = ConversationStore(extractor, max_turnos=2)
+    for i, turno in enumerate(TURNOS):
+        fila, n_tokens, n_turnos = store.agregar_mensaje("s1", turno)
+        retenidos = TURNOS[max(0, i - 1):i + 1]
+        assert n_turnos == len(retenidos)
+        assert n_tokens == sum(len(t.split()) for t in retenidos)
+        np.testing.assert_allclose(fila.toarray(), _referencia(extractor, retenidos), atol=1e-12)
+    assert store.turnos("s1") == TURNOS[-2:]
+
+
+def test_vectorizar_turnos_igual_que_sesion(extractor):
+    store = ConversationStore(extractor, max_turnos=len(TURNOS))
+    for turno in TURNOS:
+        fila, _, _ = store.agregar_mensaje("s1", turno)
+    np.testing.assert_allclose(vectorizar_turnos(extractor, TURNOS).toarray(), fila.toarray(), atol=1e-12)
+
+
+def test_sesiones_independientes_y_lru(extractor):
+    store = ConversationStore(extractor, max_sesiones=2)
+    store.agregar_mensaje("a", TURNOS[0])
+    store.agregar_mensaje("b", TURNOS[1])
+    store.agregar_mensaje("c", TURNOS[2])
+    assert len(store) == 2
+    assert store.turnos("a") == []
+    assert store.turnos("b") == [TURNOS[1]]